@@ -1,10 +1,14 @@
 import os
+import functools
 import hashlib
+import re
 import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
-import json
 
+import orjson
 import streamlit as st
 from scrapper.crawler import crawl_site
 from scrapper.extractor import extract_markdown_items
@@ -20,18 +24,41 @@ cache_dir = Path(".index_cache")
 cache_dir.mkdir(exist_ok=True)
 
 
+# Memoized: Streamlit re-runs the whole script on every widget change, so
+# these get called with the same inputs over and over
+@functools.lru_cache(maxsize=1024)
 def slugify(text: str) -> str:
-    safe = "".join(c.lower() if c.isalnum() else "-" for c in text)
-    while "--" in safe:
-        safe = safe.replace("--", "-")
-    return safe.strip("-")[:80]
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-")[:80]
 
 
+@functools.lru_cache(maxsize=1024)
 def index_name_for(url_str: str) -> str:
     h = hashlib.sha256(url_str.encode("utf-8")).hexdigest()[:12]
     return f"index_{h}"
 
 
+# Directory scans are cached so Streamlit's per-keystroke reruns don't
+# re-stat the whole outputs folder; cleared explicitly after a scrape
+@st.cache_data(ttl=10)
+def list_search_dirs() -> list:
+    if not outputs_dir.exists():
+        return []
+    return sorted(d.name for d in outputs_dir.iterdir() if d.is_dir())
+
+
+@st.cache_data(ttl=10)
+def list_json_files(search_name: str) -> list:
+    return [str(f) for f in (outputs_dir / search_name).glob("*.json")]
+
+
+@st.cache_data(ttl=10)
+def latest_json_file(search_name: str) -> str | None:
+    files = list_json_files(search_name)
+    if not files:
+        return None
+    return max(files, key=lambda f: Path(f).stat().st_mtime)
+
+
 def scrape_to_json(url_str: str) -> dict:
     includes = [p.strip() for p in include_patterns.split(",") if p.strip()]
     excludes = [p.strip() for p in exclude_patterns.split(",") if p.strip()]
@@ -46,10 +73,18 @@ def persist_run(url_str: str, data: dict) -> Path:
     run_dir = outputs_dir / site_slug
     run_dir.mkdir(parents=True, exist_ok=True)
     json_path = run_dir / f"{site_slug}-{ts}.json"
-    json_path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+    json_path.write_bytes(orjson.dumps(data, option=orjson.OPT_INDENT_2))
     return json_path
 
 
+def get_index_executor() -> ThreadPoolExecutor:
+    # One background worker shared across reruns so index builds never
+    # block the Streamlit script thread
+    if "index_executor" not in st.session_state:
+        st.session_state["index_executor"] = ThreadPoolExecutor(max_workers=1)
+    return st.session_state["index_executor"]
+
+
 def ensure_index_for(json_path: Path, url_str: str) -> Path:
     name = index_name_for(url_str)
     idx_path = cache_dir / name
@@ -57,7 +92,14 @@ def ensure_index_for(json_path: Path, url_str: str) -> Path:
         return idx_path
     if idx_path.exists():
         shutil.rmtree(idx_path)
-    build_faiss_index(str(json_path), str(idx_path))
+    future = get_index_executor().submit(build_faiss_index, str(json_path), str(idx_path))
+    with st.status("Building FAISS index…") as status:
+        started = time.time()
+        while not future.done():
+            status.update(label=f"Building FAISS index… ({int(time.time() - started)}s)")
+            time.sleep(0.5)
+        status.update(label="Index built", state="complete")
+    future.result()  # surface build errors to the caller
     return idx_path
 
 st.markdown("""
@@ -142,38 +184,33 @@ with st.sidebar:
     
     # Previous Searches
     st.subheader("📚 Previous Searches")
-    if outputs_dir.exists():
-        search_dirs = [d for d in outputs_dir.iterdir() if d.is_dir()]
-        if search_dirs:
-            search_options = ["Select a previous search..."] + [d.name for d in search_dirs]
-            selected_search = st.selectbox("Load Previous Search", search_options)
-            
-            if selected_search != "Select a previous search...":
-                search_dir = outputs_dir / selected_search
-                json_files = list(search_dir.glob("*.json"))
-                if json_files:
-                    # Get the most recent file
-                    latest_file = max(json_files, key=lambda f: f.stat().st_mtime)
-                    if st.button("Load This Search", key=f"load_search_{selected_search}"):
-                        st.session_state["last_json"] = str(latest_file)
-                        st.session_state["last_site"] = selected_search
-                        # Load the data to get item count
-                        with open(latest_file, 'r') as f:
-                            data = json.load(f)
-                        st.session_state["last_count"] = len(data.get("items", []))
-                        # Build index if it doesn't exist
-                        idx = ensure_index_for(latest_file, selected_search)
-                        st.session_state["active_index"] = str(idx)
-                        st.success(f"Loaded {len(data.get('items', []))} items from {selected_search}")
-                        st.rerun()
-                    
-                    # Show file info
-                    st.info(f"Latest: {latest_file.name}")
-                    st.info(f"Files: {len(json_files)}")
-                else:
-                    st.warning("No JSON files found in this search")
-        else:
-            st.info("No previous searches found")
+    search_dirs = list_search_dirs()
+    if search_dirs:
+        search_options = ["Select a previous search..."] + search_dirs
+        selected_search = st.selectbox("Load Previous Search", search_options)
+
+        if selected_search != "Select a previous search...":
+            json_files = list_json_files(selected_search)
+            latest = latest_json_file(selected_search)
+            if latest:
+                latest_file = Path(latest)
+                if st.button("Load This Search", key=f"load_search_{selected_search}"):
+                    st.session_state["last_json"] = str(latest_file)
+                    st.session_state["last_site"] = selected_search
+                    # Load the data to get item count
+                    data = orjson.loads(latest_file.read_bytes())
+                    st.session_state["last_count"] = len(data.get("items", []))
+                    # Build index if it doesn't exist
+                    idx = ensure_index_for(latest_file, selected_search)
+                    st.session_state["active_index"] = str(idx)
+                    st.success(f"Loaded {len(data.get('items', []))} items from {selected_search}")
+                    st.rerun()
+
+                # Show file info
+                st.info(f"Latest: {latest_file.name}")
+                st.info(f"Files: {len(json_files)}")
+            else:
+                st.warning("No JSON files found in this search")
     else:
         st.info("No previous searches found")
     
@@ -234,6 +271,7 @@ if go:
             else:
                 data = scrape_to_json(url)
                 json_path = persist_run(url, data)
+                st.cache_data.clear()  # new files on disk: invalidate directory snapshots
                 idx = ensure_index_for(json_path, url)
                 st.session_state["active_index"] = str(idx)
                 st.session_state["last_json"] = str(json_path)
@@ -299,10 +337,10 @@ if st.session_state.get("last_json"):
     search_dir = json_path.parent
     
     # Show all files in this search
-    all_files = list(search_dir.glob("*.json"))
+    all_files = [Path(f) for f in list_json_files(search_dir.name)]
     if all_files:
         st.write(f"**Files in this search ({len(all_files)}):**")
-        
+
         col1, col2, col3 = st.columns([2, 1, 1])
         for i, file in enumerate(sorted(all_files, key=lambda f: f.stat().st_mtime, reverse=True)):
             with col1:
@@ -338,6 +376,7 @@ if st.session_state.get("last_json"):
                 # Delete the search directory
                 import shutil
                 shutil.rmtree(search_dir)
+                st.cache_data.clear()  # directory is gone: invalidate cached snapshots
                 # Clear session state
                 for key in ["last_json", "last_site", "last_count", "active_index"]:
                     if key in st.session_state:
@@ -0,0 +1,44 @@
+from __future__ import annotations
+import os
+from functools import lru_cache
+
+import torch
+from langchain_community.embeddings import HuggingFaceEmbeddings
+
+from .onnx_embeddings import maybe_onnx_embedder
+
+EMBED_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+
+
+def embed_device() -> str:
+    """Embedding device: KB_EMBED_DEVICE wins, else CUDA when available."""
+    override = os.environ.get("KB_EMBED_DEVICE")
+    if override:
+        return override
+    return "cuda" if torch.cuda.is_available() else "cpu"
+
+
+@lru_cache(maxsize=1)
+def get_embedder():
+    """Single shared embedder for indexing and querying.
+
+    Prefers the INT8 ONNX session when available (CPU), otherwise the free
+    HuggingFace MiniLM weights on the best available device — fp16 on CUDA,
+    where tensor cores give an order-of-magnitude speedup with negligible
+    embedding drift. Cached so the ~90 MB model, tokenizer and buffers load
+    once per process instead of once per call site."""
+    onnx = maybe_onnx_embedder()
+    if onnx is not None:
+        return onnx
+    device = embed_device()
+    embedder = HuggingFaceEmbeddings(
+        model_name=EMBED_MODEL_NAME,
+        model_kwargs={"device": device},
+        encode_kwargs={"batch_size": 128 if device == "cuda" else 32, "normalize_embeddings": True},
+    )
+    if device == "cuda":
+        try:
+            embedder.client.half()
+        except Exception:
+            pass
+    return embedder
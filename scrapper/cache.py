@@ -0,0 +1,110 @@
+from __future__ import annotations
+import hashlib
+import json
+import sqlite3
+import time
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+
+
+CACHE_PATH = Path(".scrape_cache") / "pages.db"
+DEFAULT_TTL_SECONDS = 24 * 3600
+_COMPRESS_LEVEL = 6
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    key TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    html_gz BLOB,
+    item_json TEXT
+)
+"""
+
+_conn: sqlite3.Connection | None = None
+
+
+@dataclass
+class CachedPage:
+    url: str
+    fetched_at: float
+    etag: str | None
+    last_modified: str | None
+    html: bytes | None
+    item: dict | None
+
+
+def _connect() -> sqlite3.Connection:
+    global _conn
+    if _conn is None:
+        CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        _conn = sqlite3.connect(CACHE_PATH, check_same_thread=False)
+        _conn.execute("PRAGMA journal_mode=WAL")
+        _conn.execute(_SCHEMA)
+        _conn.commit()
+    return _conn
+
+
+def _key(url: str) -> str:
+    return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+
+def get(url: str) -> CachedPage | None:
+    try:
+        conn = _connect()
+        row = conn.execute(
+            "SELECT url, fetched_at, etag, last_modified, html_gz, item_json FROM pages WHERE key = ?",
+            (_key(url),),
+        ).fetchone()
+        if row is None:
+            return None
+        html = zlib.decompress(row[4]) if row[4] else None
+        item = json.loads(row[5]) if row[5] else None
+        return CachedPage(url=row[0], fetched_at=row[1], etag=row[2], last_modified=row[3], html=html, item=item)
+    except Exception:
+        return None
+
+
+def is_fresh(page: CachedPage, ttl: int = DEFAULT_TTL_SECONDS) -> bool:
+    return time.time() - page.fetched_at < ttl
+
+
+def put_html(url: str, html: str | bytes, etag: str | None = None, last_modified: str | None = None) -> None:
+    try:
+        if isinstance(html, str):
+            html = html.encode("utf-8")
+        conn = _connect()
+        conn.execute(
+            "INSERT INTO pages (key, url, fetched_at, etag, last_modified, html_gz, item_json) VALUES (?, ?, ?, ?, ?, ?, NULL) "
+            "ON CONFLICT(key) DO UPDATE SET fetched_at = excluded.fetched_at, etag = excluded.etag, "
+            "last_modified = excluded.last_modified, html_gz = excluded.html_gz, item_json = NULL",
+            (_key(url), url, time.time(), etag, last_modified, zlib.compress(html, _COMPRESS_LEVEL)),
+        )
+        conn.commit()
+    except Exception:
+        pass
+
+
+def put_item(url: str, item: dict) -> None:
+    try:
+        conn = _connect()
+        conn.execute(
+            "UPDATE pages SET item_json = ? WHERE key = ?",
+            (json.dumps(item, ensure_ascii=False), _key(url)),
+        )
+        conn.commit()
+    except Exception:
+        pass
+
+
+def touch(url: str) -> None:
+    """Refresh fetched_at after a 304 Not Modified revalidation."""
+    try:
+        conn = _connect()
+        conn.execute("UPDATE pages SET fetched_at = ? WHERE key = ?", (time.time(), _key(url)))
+        conn.commit()
+    except Exception:
+        pass
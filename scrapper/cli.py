@@ -1,7 +1,7 @@
-import json
 import sys
 import argparse
 from typing import Optional, List
+import orjson
 from rich import print
 from .crawler import crawl_site
 from .extractor import extract_markdown_items
@@ -37,11 +37,11 @@ def main():
     }
 
     if args.output:
-        with open(args.output, "w", encoding="utf-8") as f:
-            json.dump(result, f, ensure_ascii=False, indent=2)
+        with open(args.output, "wb") as f:
+            f.write(orjson.dumps(result, option=orjson.OPT_INDENT_2))
         print(f"[green]Saved[/green] {len(items)} items to {args.output}")
     else:
-        print(json.dumps(result, ensure_ascii=False))
+        print(orjson.dumps(result).decode())
 
 
 if __name__ == "__main__":
@@ -1,14 +1,27 @@
 import asyncio
+import itertools
+import logging
 import re
+import threading
 import urllib.parse
+import urllib.robotparser
 from dataclasses import dataclass
-from typing import Iterable, List, Set, Dict
+from typing import Iterable, List, Set, Dict, Tuple
 
 import httpx
 import tldextract
-from bs4 import BeautifulSoup
+import lxml.etree
+import lxml.html
+import xxhash
 import feedparser
 
+try:
+    from selectolax.parser import HTMLParser as SelectolaxParser
+except ImportError:
+    SelectolaxParser = None
+
+
+logger = logging.getLogger(__name__)
 
 CRAWL_TIMEOUT_SECONDS = 20
 DEFAULT_HEADERS = {
@@ -22,26 +35,88 @@ class CrawlContext:
     root: str
     root_host: str
     allowed_hosts: Set[str]
+    allowed_suffixes: tuple
+
+
+# Query params that only carry attribution state — the same article with and
+# without them would otherwise count twice against max_pages
+_TRACKING_PARAMS = frozenset({"ref", "fbclid", "gclid", "msclkid", "igshid", "mkt_tok", "_hsenc", "_hsmi"})
+_TRACKING_PREFIXES = ("utm_", "mc_", "pk_", "piwik_")
+
+
+def _canonical_query(query: str) -> str:
+    if not query:
+        return ""
+    kept = [
+        (k, v)
+        for k, v in urllib.parse.parse_qsl(query, keep_blank_values=True)
+        if k.lower() not in _TRACKING_PARAMS and not k.lower().startswith(_TRACKING_PREFIXES)
+    ]
+    kept.sort()
+    return urllib.parse.urlencode(kept)
+
+
+def _canonical_path(path: str) -> str:
+    if not path:
+        return "/"
+    while "//" in path:
+        path = path.replace("//", "/")
+    if path.endswith("/index.html"):
+        path = path[: -len("index.html")]
+    if path != "/":
+        path = path.rstrip("/") or "/"
+    return path
+
+
+def normalize_parts(parts: urllib.parse.SplitResult) -> str:
+    if not parts.scheme:
+        return urllib.parse.urlunsplit(parts)
+    # Lowercase only scheme and host (paths can be case-sensitive), drop
+    # fragments, strip tracking params and canonicalize path/query ordering
+    netloc = parts.netloc.lower()
+    scheme = parts.scheme.lower()
+    return urllib.parse.urlunsplit((scheme, netloc, _canonical_path(parts.path), _canonical_query(parts.query), ""))
 
 
 def normalize_url(url: str) -> str:
     try:
-        parsed = urllib.parse.urlparse(url)
-        if not parsed.scheme:
-            return url
-        # Drop fragments
-        parsed = parsed._replace(fragment="")
-        # Normalize scheme/host
-        netloc = parsed.netloc.lower()
-        scheme = parsed.scheme.lower()
-        return urllib.parse.urlunparse((scheme, netloc, parsed.path or "/", parsed.params, parsed.query, ""))
+        return normalize_parts(urllib.parse.urlsplit(url))
     except Exception:
         return url
 
 
-def same_site(url: str, ctx: CrawlContext) -> bool:
-    host = urllib.parse.urlparse(url).netloc.lower()
-    return host in ctx.allowed_hosts or host.endswith("." + ctx.root_host)
+# Extensions that can never yield HTML — filtered before a URL is queued so
+# no round-trip is wasted discovering that via the content-type header
+_SKIP_EXT = frozenset([
+    ".pdf", ".png", ".jpg", ".jpeg", ".gif", ".webp", ".svg",
+    ".mp4", ".mp3", ".zip", ".tar", ".gz",
+    ".css", ".js", ".woff", ".woff2", ".ico",
+])
+
+
+def has_skipped_extension(path: str) -> bool:
+    dot = path.rfind(".")
+    if dot == -1:
+        return False
+    return path[dot:].lower() in _SKIP_EXT
+
+
+def url_hash(url: str) -> int:
+    """64-bit fingerprint used for queue dedup instead of storing full URLs."""
+    return xxhash.xxh3_64_intdigest(url.encode("utf-8"))
+
+
+def split_host(url: str) -> str:
+    try:
+        return urllib.parse.urlsplit(url).netloc.lower()
+    except Exception:
+        return ""
+
+
+def same_site(host: str, ctx: CrawlContext) -> bool:
+    # host is already lowercased by the caller; endswith on a tuple is a
+    # single C-level call instead of a per-suffix Python loop
+    return host in ctx.allowed_hosts or host.endswith(ctx.allowed_suffixes)
 
 
 async def fetch(client: httpx.AsyncClient, url: str) -> httpx.Response | None:
@@ -80,8 +155,13 @@ def guess_sitemaps(base_url: str) -> List[str]:
     return [urllib.parse.urljoin(root + '/', c.lstrip('/')) for c in candidates]
 
 
+# One extractor instance using the bundled suffix-list snapshot: no network
+# fetch and no per-call re-initialization of the public-suffix data
+_TLD = tldextract.TLDExtract(suffix_list_urls=(), cache_dir=None, include_psl_private_domains=False)
+
+
 def extract_domain(url: str) -> str:
-    ext = tldextract.extract(url)
+    ext = _TLD(url)
     parts = [p for p in [ext.domain, ext.suffix] if p]
     return ".".join(parts)
 
@@ -91,34 +171,41 @@ def build_ctx(root_url: str) -> CrawlContext:
     host = parsed.netloc.lower()
     root_host = extract_domain(root_url)
     allowed_hosts = {host, root_host, f"www.{root_host}"}
-    return CrawlContext(root=normalize_url(root_url), root_host=root_host, allowed_hosts=allowed_hosts)
+    return CrawlContext(
+        root=normalize_url(root_url),
+        root_host=root_host,
+        allowed_hosts=allowed_hosts,
+        allowed_suffixes=("." + root_host,),
+    )
 
 
-def discover_from_sitemap(base_url: str) -> Set[str]:
+async def discover_from_sitemap(client: httpx.AsyncClient, base_url: str) -> Set[str]:
     discovered: Set[str] = set()
-    try:
-        for sm_url in guess_sitemaps(base_url):
-            try:
-                resp = httpx.get(sm_url, headers=DEFAULT_HEADERS, timeout=10)
-                if resp.status_code != 200:
-                    continue
-                soup = BeautifulSoup(resp.text, "xml")
-                # Handle both sitemap and sitemapindex
-                for loc in soup.find_all("loc"):
-                    if loc.text:
-                        discovered.add(normalize_url(loc.text))
-            except Exception:
-                continue
-    except Exception:
-        pass
+    candidates = guess_sitemaps(base_url)
+    responses = await asyncio.gather(*(fetch(client, u) for u in candidates))
+    for resp in responses:
+        if resp is None:
+            continue
+        try:
+            # Handle both sitemap and sitemapindex; {*} matches any namespace
+            root = lxml.etree.fromstring(resp.content)
+            for loc in root.iter("{*}loc"):
+                if loc.text:
+                    discovered.add(normalize_url(loc.text.strip()))
+        except Exception:
+            continue
     return discovered
 
 
-def discover_from_feeds(base_url: str) -> Set[str]:
+async def discover_from_feeds(client: httpx.AsyncClient, base_url: str) -> Set[str]:
     urls: Set[str] = set()
-    for feed_url in guess_feeds(base_url):
+    feed_urls = guess_feeds(base_url)
+    responses = await asyncio.gather(*(fetch(client, u) for u in feed_urls))
+    for feed_url, resp in zip(feed_urls, responses):
+        if resp is None:
+            continue
         try:
-            parsed = feedparser.parse(feed_url)
+            parsed = feedparser.parse(resp.text)
             if parsed.bozo:
                 continue
             for entry in parsed.entries:
@@ -130,90 +217,212 @@ def discover_from_feeds(base_url: str) -> Set[str]:
     return urls
 
 
+# Queue priorities: lower is fetched first. Feed entries are almost always
+# articles, sitemap article-like URLs next, then include-pattern matches;
+# everything else competes last for the max_pages budget.
+PRIORITY_FEED = 0
+PRIORITY_SITEMAP_ARTICLE = 1
+PRIORITY_MATCH = 2
+PRIORITY_OTHER = 3
+
+
+# Heuristics for typical content URLs, combined into one alternation so each
+# check is a single compiled-regex pass instead of a Python loop over patterns
+_ARTICLE_PATTERNS = [
+    r"/blog/",
+    r"/posts?/",
+    r"/articles?/",
+    r"/guides?/",
+    r"/learn/",
+    r"/topics",
+    r"/news/",
+    r"/insights/",
+    r"/stories/",
+    r"/resources?/",
+    r"/case-studies?/",
+]
+_ARTICLE_RE = re.compile("|".join(f"(?:{p})" for p in _ARTICLE_PATTERNS), re.IGNORECASE)
+
+
+def compile_patterns(patterns: List[str]) -> re.Pattern | None:
+    """Combine user-supplied regex patterns into one compiled alternation."""
+    if not patterns:
+        return None
+    return re.compile("|".join(f"(?:{p})" for p in patterns))
+
+
 def looks_like_article_url(url: str) -> bool:
-    # Heuristics for typical content URLs
-    patterns = [
-        r"/blog/",
-        r"/posts?/",
-        r"/articles?/",
-        r"/guides?/",
-        r"/learn/",
-        r"/topics",
-        r"/news/",
-        r"/insights/",
-        r"/stories/",
-        r"/resources?/",
-        r"/case-studies?/",
-    ]
-    return any(re.search(p, url, flags=re.IGNORECASE) for p in patterns)
+    return _ARTICLE_RE.search(url) is not None
+
+
+def _iter_hrefs(html: str | bytes) -> List[str]:
+    # selectolax (and raw lxml as fallback) skip BS4's per-node Python
+    # wrappers — link extraction is the per-page hot path of the crawler
+    if SelectolaxParser is not None:
+        return [node.attributes.get("href") for node in SelectolaxParser(html).css("a[href]")]
+    return lxml.html.fromstring(html).xpath("//a/@href")
 
 
-def inpage_discover(html: str, base_url: str) -> Set[str]:
-    soup = BeautifulSoup(html, "lxml")
-    found: Set[str] = set()
-    for a in soup.find_all("a", href=True):
-        href = a.get("href")
-        if href.startswith("mailto:") or href.startswith("tel:"):
+def inpage_discover(html: str | bytes, base_url: str) -> Set[Tuple[str, str]]:
+    """Return (normalized_url, host) pairs — one urlsplit per link, with the
+    host passed forward so same_site never has to re-parse the URL."""
+    found: Set[Tuple[str, str]] = set()
+    try:
+        hrefs = _iter_hrefs(html)
+    except Exception:
+        return found
+    for href in hrefs:
+        if not href or href.startswith("mailto:") or href.startswith("tel:"):
             continue
         joined = urllib.parse.urljoin(base_url, href)
-        found.add(normalize_url(joined))
+        try:
+            parts = urllib.parse.urlsplit(joined)
+        except Exception:
+            continue
+        if has_skipped_extension(parts.path):
+            continue
+        found.add((normalize_parts(parts), parts.netloc.lower()))
     return found
 
 
-async def crawl_bfs(root_url: str, max_pages: int, concurrency: int, include_patterns: List[str], exclude_patterns: List[str]) -> Set[str]:
+async def crawl_bfs(root_url: str, max_pages: int, concurrency: int, include_patterns: List[str], exclude_patterns: List[str]) -> Tuple[Set[str], Set[str]]:
     ctx = build_ctx(root_url)
-    to_visit: asyncio.Queue[str] = asyncio.Queue()
-    seen: Set[str] = set()
+    # Priority frontier: high-value article candidates are fetched before
+    # generic in-site links, so the max_pages budget goes to useful pages.
+    # The counter keeps FIFO order within a priority class.
+    to_visit: asyncio.PriorityQueue = asyncio.PriorityQueue()
+    counter = itertools.count()
+    # 8-byte hashes instead of ~100-byte URL strings; exact URLs are only kept
+    # for pages we actually fetched (results)
+    seen_hashes: Set[int] = set()
     results: Set[str] = set()
+    seed_urls: Set[str] = set()
 
-    # Seed with root
-    await to_visit.put(ctx.root)
+    exclude_re = compile_patterns(exclude_patterns or [])
+    include_re = compile_patterns(include_patterns or [])
+
+    async def put_url(url: str, score: int) -> None:
+        await to_visit.put((score, next(counter), url))
 
-    # Also seed with sitemap and feed discoveries for depth
-    seed_urls = set()
-    seed_urls |= discover_from_sitemap(ctx.root)
-    seed_urls |= discover_from_feeds(ctx.root)
-    for u in list(seed_urls)[:max(100, max_pages // 2)]:
-        await to_visit.put(u)
+    def score_link(url: str) -> int:
+        if include_re and include_re.search(url):
+            return PRIORITY_MATCH
+        if looks_like_article_url(url):
+            return PRIORITY_MATCH
+        return PRIORITY_OTHER
 
-    sem = asyncio.Semaphore(concurrency)
+    # Seed with root
+    await put_url(ctx.root, PRIORITY_FEED)
+
+    # One persistent HTTP/2 client: same-origin crawls multiplex many streams
+    # over a handful of connections instead of one TCP+TLS handshake per worker.
+    limits = httpx.Limits(
+        max_connections=concurrency * 2,
+        max_keepalive_connections=concurrency * 2,
+        keepalive_expiry=30.0,
+    )
+    timeout = httpx.Timeout(CRAWL_TIMEOUT_SECONDS, connect=5.0)
+    transport = httpx.AsyncHTTPTransport(retries=1, http2=True)
+
+    async with httpx.AsyncClient(
+        http2=True,
+        headers=DEFAULT_HEADERS,
+        follow_redirects=True,
+        limits=limits,
+        timeout=timeout,
+        transport=transport,
+    ) as client:
+        # robots.txt is fetched once per origin and consulted before fetching
+        robots_cache: Dict[str, urllib.robotparser.RobotFileParser | None] = {}
+
+        async def robots_for(origin: str) -> urllib.robotparser.RobotFileParser | None:
+            if origin in robots_cache:
+                return robots_cache[origin]
+            rp: urllib.robotparser.RobotFileParser | None = None
+            resp = await fetch(client, origin + "/robots.txt")
+            if resp is not None:
+                try:
+                    parser = urllib.robotparser.RobotFileParser()
+                    parser.parse(resp.text.splitlines())
+                    rp = parser
+                except Exception:
+                    rp = None
+            robots_cache[origin] = rp
+            return rp
+
+        async def robots_allowed(url: str) -> bool:
+            parts = urllib.parse.urlsplit(url)
+            if not parts.scheme or not parts.netloc:
+                return True
+            rp = await robots_for(f"{parts.scheme}://{parts.netloc}")
+            if rp is None:
+                return True
+            try:
+                return rp.can_fetch(DEFAULT_HEADERS["User-Agent"], url)
+            except Exception:
+                return True
+
+        # Sitemap and feed discovery runs concurrently with the crawl itself
+        # instead of stacking up to a dozen sequential requests beforehand
+        async def seed_from_discovery():
+            from_sitemap, from_feeds = await asyncio.gather(
+                discover_from_sitemap(client, ctx.root),
+                discover_from_feeds(client, ctx.root),
+            )
+            seed_urls.update(from_sitemap | from_feeds)
+            budget = max(100, max_pages // 2)
+            for u in list(from_feeds)[:budget]:
+                await put_url(u, PRIORITY_FEED)
+            for u in list(from_sitemap - from_feeds)[:budget]:
+                await put_url(u, PRIORITY_SITEMAP_ARTICLE if looks_like_article_url(u) else PRIORITY_OTHER)
+
+        seed_job = asyncio.create_task(seed_from_discovery())
 
-    async with httpx.AsyncClient(headers=DEFAULT_HEADERS, follow_redirects=True) as client:
         async def worker():
             nonlocal results
             while len(results) < max_pages:
                 try:
-                    current = await asyncio.wait_for(to_visit.get(), timeout=1.0)
+                    _, _, current = await asyncio.wait_for(to_visit.get(), timeout=1.0)
                 except asyncio.TimeoutError:
-                    break
-                if current in seen:
+                    if seed_job.done():
+                        break
+                    continue
+                current_hash = url_hash(current)
+                if current_hash in seen_hashes:
                     to_visit.task_done()
                     continue
-                seen.add(current)
+                seen_hashes.add(current_hash)
 
-                if not same_site(current, ctx):
+                if not same_site(split_host(current), ctx):
                     to_visit.task_done()
                     continue
 
-                if any(re.search(p, current) for p in exclude_patterns or []):
+                if exclude_re and exclude_re.search(current):
                     to_visit.task_done()
                     continue
                 
                 # Only apply include patterns to URLs we're considering for results
                 # Don't filter out URLs during discovery phase
 
-                async with sem:
-                    resp = await fetch(client, current)
+                if not await robots_allowed(current):
+                    to_visit.task_done()
+                    continue
+
+                resp = await fetch(client, current)
                 if not resp:
                     to_visit.task_done()
                     continue
 
+                # Prefix check instead of a substring scan over the full header
+                # (also accepts XHTML, which was previously dropped)
                 ctype = resp.headers.get("content-type", "")
-                if "text/html" not in ctype:
+                if not ctype.startswith(("text/html", "application/xhtml")):
                     to_visit.task_done()
                     continue
 
-                html = resp.text
+                # Raw bytes: lxml/selectolax detect the charset themselves, so
+                # skipping resp.text avoids a decode+re-encode round-trip
+                html = resp.content
                 results.add(current)
 
                 if len(results) >= max_pages:
@@ -222,38 +431,41 @@ async def crawl_bfs(root_url: str, max_pages: int, concurrency: int, include_pat
 
                 # Enqueue children
                 discovered_links = inpage_discover(html, current)
-                print(f"Discovered {len(discovered_links)} links from {current}")
-                for link in discovered_links:
-                    if same_site(link, ctx) and link not in seen:
-                        await to_visit.put(link)
-                        print(f"  Added to queue: {link}")
-                    else:
-                        print(f"  Skipped: {link} (same_site={same_site(link, ctx)}, seen={link in seen})")
+                enqueued = 0
+                for link, link_host in discovered_links:
+                    if same_site(link_host, ctx) and url_hash(link) not in seen_hashes:
+                        await put_url(link, score_link(link))
+                        enqueued += 1
+                    elif logger.isEnabledFor(logging.DEBUG):
+                        logger.debug("skipped %s (same_site=%s, seen=%s)", link, same_site(link_host, ctx), url_hash(link) in seen_hashes)
+                logger.debug("page=%s discovered=%d enqueued=%d", current, len(discovered_links), enqueued)
                 to_visit.task_done()
 
         tasks = [asyncio.create_task(worker()) for _ in range(concurrency)]
-        await asyncio.gather(*tasks)
+        await asyncio.gather(seed_job, *tasks)
 
-    return results
+    return results, seed_urls
 
 
-def crawl_site(root_url: str, max_pages: int, concurrency: int, include_patterns: List[str], exclude_patterns: List[str]) -> List[str]:
-    # Build context
-    ctx = build_ctx(root_url)
-    
-    urls_from_sitemap = discover_from_sitemap(root_url)
-    urls_from_feeds = discover_from_feeds(root_url)
-    seed = list(urls_from_sitemap | urls_from_feeds)
+# Reused across crawl_site calls: creating and tearing down a loop per call
+# is slow (resolver + thread pool setup) and would also drop DNS/TLS state.
+# Thread-local so concurrent crawl_site calls from different threads each
+# get their own loop instead of racing on one.
+_LOOP_STATE = threading.local()
+
 
-    # BFS crawl to augment
+def _get_loop() -> asyncio.AbstractEventLoop:
+    loop = getattr(_LOOP_STATE, "loop", None)
+    if loop is None or loop.is_closed():
+        loop = asyncio.new_event_loop()
+        _LOOP_STATE.loop = loop
+    return loop
+
+
+def crawl_site(root_url: str, max_pages: int, concurrency: int, include_patterns: List[str], exclude_patterns: List[str]) -> List[str]:
     all_urls: Set[str] = set()
-    loop = asyncio.new_event_loop()
-    try:
-        asyncio.set_event_loop(loop)
-        crawled = loop.run_until_complete(crawl_bfs(root_url, max_pages, concurrency, include_patterns, exclude_patterns))
-        all_urls |= crawled
-    finally:
-        loop.close()
+    crawled, seed = _get_loop().run_until_complete(crawl_bfs(root_url, max_pages, concurrency, include_patterns, exclude_patterns))
+    all_urls |= crawled
 
     # Ensure seed candidates are included, but cap to max_pages
     for u in seed:
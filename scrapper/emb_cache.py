@@ -0,0 +1,77 @@
+from __future__ import annotations
+import hashlib
+import sqlite3
+from pathlib import Path
+from typing import Callable, List
+
+import numpy as np
+
+
+CACHE_PATH = Path(".scrape_cache") / "embeddings.db"
+EMBED_DIM = 384
+# SQLite caps the number of bound parameters, so lookups go out in chunks
+_SELECT_CHUNK = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    hash BLOB PRIMARY KEY,
+    vec BLOB NOT NULL
+)
+"""
+
+_conn: sqlite3.Connection | None = None
+
+
+def _connect() -> sqlite3.Connection:
+    global _conn
+    if _conn is None:
+        CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        _conn = sqlite3.connect(CACHE_PATH, check_same_thread=False)
+        _conn.execute("PRAGMA journal_mode=WAL")
+        _conn.execute(_SCHEMA)
+        _conn.commit()
+    return _conn
+
+
+def _hash(text: str, model_id: str) -> bytes:
+    # Keyed by model id so switching encoders never serves stale vectors
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16, key=model_id.encode("utf-8")).digest()
+
+
+def get_or_compute(texts: List[str], encode_fn: Callable[[List[str]], np.ndarray], model_id: str) -> np.ndarray:
+    """Return embeddings for texts, pulling known vectors from the cache and
+    sending only the misses through encode_fn. New vectors are written back
+    in one transaction."""
+    try:
+        conn = _connect()
+    except Exception:
+        return np.asarray(encode_fn(texts), dtype=np.float32)
+
+    hashes = [_hash(t, model_id) for t in texts]
+    found: dict = {}
+    try:
+        for start in range(0, len(hashes), _SELECT_CHUNK):
+            chunk = list(dict.fromkeys(hashes[start:start + _SELECT_CHUNK]))
+            placeholders = ",".join("?" * len(chunk))
+            for h, vec in conn.execute(f"SELECT hash, vec FROM cache WHERE hash IN ({placeholders})", chunk):
+                found[h] = np.frombuffer(vec, dtype=np.float32)
+    except Exception:
+        found = {}
+
+    miss_idx = [i for i, h in enumerate(hashes) if h not in found]
+    if miss_idx:
+        computed = np.asarray(encode_fn([texts[i] for i in miss_idx]), dtype=np.float32)
+        rows = []
+        for j, i in enumerate(miss_idx):
+            found[hashes[i]] = computed[j]
+            rows.append((hashes[i], computed[j].tobytes()))
+        try:
+            conn.executemany("INSERT OR REPLACE INTO cache (hash, vec) VALUES (?, ?)", rows)
+            conn.commit()
+        except Exception:
+            pass
+
+    xb = np.empty((len(texts), EMBED_DIM), dtype=np.float32)
+    for i, h in enumerate(hashes):
+        xb[i] = found[h]
+    return xb
@@ -1,45 +1,72 @@
 from __future__ import annotations
+import asyncio
+import os
 import re
 import urllib.parse
+from concurrent.futures import ProcessPoolExecutor
 from typing import List, Dict, Any
 
+import lxml.html
 import trafilatura
 from readability import Document
-from bs4 import BeautifulSoup
 from markdownify import markdownify as md
 import httpx
 
+from . import cache
+
 HEADERS = {
     "User-Agent": "AlineScraper/0.1 (+https://example.com)",
 }
+FETCH_TIMEOUT_SECONDS = 20
+DEFAULT_CONCURRENCY = 16
 
 
-def fetch_html(url: str) -> str | None:
+async def fetch_html(client: httpx.AsyncClient, url: str, cached: cache.CachedPage | None = None) -> bytes | None:
     try:
-        resp = httpx.get(url, headers=HEADERS, follow_redirects=True, timeout=20)
+        headers = {}
+        if cached is not None:
+            if cached.etag:
+                headers["If-None-Match"] = cached.etag
+            if cached.last_modified:
+                headers["If-Modified-Since"] = cached.last_modified
+        resp = await client.get(url, headers=headers)
+        if resp.status_code == 304 and cached is not None and cached.html:
+            cache.touch(url)
+            return cached.html
         if resp.status_code >= 400:
             return None
-        if "text/html" not in resp.headers.get("content-type", ""):
+        if not resp.headers.get("content-type", "").startswith(("text/html", "application/xhtml")):
             return None
-        return resp.text
+        # Raw bytes end-to-end: lxml detects the charset itself, so the
+        # response body is never decoded to str on the fetch path
+        cache.put_html(url, resp.content, etag=resp.headers.get("etag"), last_modified=resp.headers.get("last-modified"))
+        return resp.content
     except Exception:
         return None
 
 
-def extract_title_from_html(html: str) -> str | None:
+def decode_html(html: str | bytes) -> str:
+    if isinstance(html, bytes):
+        return html.decode("utf-8", errors="replace")
+    return html
+
+
+def extract_title_from_tree(tree: lxml.html.HtmlElement) -> str | None:
     try:
-        soup = BeautifulSoup(html, "lxml")
-        if soup.title and soup.title.string:
-            return soup.title.string.strip()
-        h1 = soup.find("h1")
-        if h1 and h1.get_text(strip=True):
-            return h1.get_text(strip=True)
+        title = tree.findtext(".//title")
+        if title and title.strip():
+            return title.strip()
+        h1 = tree.find(".//h1")
+        if h1 is not None:
+            text = h1.text_content().strip()
+            if text:
+                return text
     except Exception:
         return None
     return None
 
 
-def html_to_markdown(html: str) -> str:
+def html_to_markdown(html: str | bytes, tree: lxml.html.HtmlElement | None = None) -> str:
     # Prefer readability main content, fall back to markdownify of full body
     try:
         doc = Document(html)
@@ -49,34 +76,36 @@ def html_to_markdown(html: str) -> str:
     except Exception:
         pass
     try:
-        soup = BeautifulSoup(html, "lxml")
-        body = soup.body or soup
-        return md(str(body), heading_style="ATX").strip()
+        if tree is None:
+            tree = lxml.html.fromstring(html)
+        body = tree.find("body")
+        body_html = lxml.html.tostring(body if body is not None else tree, encoding="unicode")
+        return md(body_html, heading_style="ATX").strip()
     except Exception:
         return ""
 
 
-def extract_with_trafilatura(url: str, html: str) -> tuple[str | None, str | None]:
+def extract_with_trafilatura(url: str, html_or_tree) -> str | None:
     try:
+        # readability is our fallback already, so skip trafilatura's internal one.
+        # A pre-parsed lxml tree is accepted and skips trafilatura's own parse.
         downloaded = trafilatura.extract(
-            html,
+            html_or_tree,
             include_comments=False,
             include_links=False,
             output_format="markdown",
             favor_recall=True,
-            with_metadata=True,
+            fast=True,  # no_fallback was renamed in 1.8 and removed in 2.x
             url=url,
         )
         if downloaded:
-            # Trafilatura returns markdown already, but keep title detection separate
-            title = extract_title_from_html(html) or trafilatura.bare_extraction(html).get("title") if trafilatura.bare_extraction(html) else None
-            return title, downloaded.strip()
+            return downloaded.strip()
     except Exception:
         pass
-    return None, None
+    return None
 
 
-def guess_content_type(url: str, html: str) -> str:
+def guess_content_type(url: str) -> str:
     # Heuristics across technical content types
     url_l = url.lower()
     if any(x in url_l for x in ["/blog/", "/post/", "/posts/", "/article", "/insights", "/news/"]):
@@ -87,23 +116,76 @@ def guess_content_type(url: str, html: str) -> str:
     return "other"
 
 
-def extract_markdown_items(urls: List[str]) -> List[Dict[str, Any]]:
-    items: List[Dict[str, Any]] = []
-    for url in urls:
-        html = fetch_html(url)
-        if not html:
-            continue
-        title, content_md = extract_with_trafilatura(url, html)
-        if not content_md:
-            # fallback to readability → markdownify
-            content_md = html_to_markdown(html)
-        title = title or extract_title_from_html(html) or url
-        content_type = guess_content_type(url, html)
-        if content_md and len(content_md.strip()) > 0:
-            items.append({
-                "title": title,
-                "content": content_md,
-                "content_type": content_type,
-                "source_url": url,
-            })
-    return items
+# Parsing below this size is cheaper than shipping the HTML to a worker process
+SMALL_HTML_BYTES = 4096
+
+
+def _parse_one(url: str, html: str | bytes) -> Dict[str, Any] | None:
+    # One lxml tree per URL, shared by trafilatura, title extraction and the
+    # markdownify fallback; bytes input lets lxml handle charset detection
+    try:
+        tree = lxml.html.fromstring(html)
+    except Exception:
+        tree = None
+    title = extract_title_from_tree(tree) if tree is not None else None
+    content_md = extract_with_trafilatura(url, tree if tree is not None else decode_html(html))
+    if not content_md:
+        # fallback to readability → markdownify
+        content_md = html_to_markdown(html, tree=tree)
+    if not title:
+        try:
+            meta = trafilatura.bare_extraction(tree if tree is not None else decode_html(html), url=url)
+            # trafilatura <2 returns a dict, 2.x a Document object
+            if isinstance(meta, dict):
+                title = meta.get("title")
+            else:
+                title = getattr(meta, "title", None)
+        except Exception:
+            title = None
+    title = title or url
+    content_type = guess_content_type(url)
+    if content_md and len(content_md.strip()) > 0:
+        return {
+            "title": title,
+            "content": content_md,
+            "content_type": content_type,
+            "source_url": url,
+        }
+    return None
+
+
+async def _extract_all(urls: List[str], concurrency: int) -> List[Dict[str, Any]]:
+    sem = asyncio.Semaphore(concurrency)
+    loop = asyncio.get_running_loop()
+
+    async with httpx.AsyncClient(
+        headers=HEADERS,
+        follow_redirects=True,
+        timeout=FETCH_TIMEOUT_SECONDS,
+        http2=True,
+    ) as client:
+        with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+            async def worker(url: str) -> Dict[str, Any] | None:
+                cached = cache.get(url)
+                if cached and cached.item and cache.is_fresh(cached):
+                    return cached.item
+                async with sem:
+                    html = await fetch_html(client, url, cached=cached)
+                if not html:
+                    return None
+                # Tiny pages aren't worth the IPC round-trip to a worker
+                if len(html) < SMALL_HTML_BYTES:
+                    item = _parse_one(url, html)
+                else:
+                    item = await loop.run_in_executor(executor, _parse_one, url, html)
+                if item:
+                    cache.put_item(url, item)
+                return item
+
+            results = await asyncio.gather(*(worker(u) for u in urls))
+
+    return [item for item in results if item]
+
+
+def extract_markdown_items(urls: List[str], concurrency: int = DEFAULT_CONCURRENCY) -> List[Dict[str, Any]]:
+    return asyncio.run(_extract_all(urls, concurrency))
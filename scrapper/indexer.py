@@ -1,67 +1,279 @@
 from __future__ import annotations
-import json
+import hashlib
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
 from typing import List, Dict
 from pathlib import Path
 
+import faiss
+import numpy as np
+import orjson
+import torch
+from sentence_transformers import SentenceTransformer
 from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+try:
+    from semantic_text_splitter import TextSplitter
+except ImportError:
+    TextSplitter = None
+from langchain_community.docstore.in_memory import InMemoryDocstore
 from langchain_community.vectorstores import FAISS
-from langchain_community.embeddings import HuggingFaceEmbeddings
+from langchain_community.vectorstores.utils import DistanceStrategy
+from . import emb_cache
+from ._models import EMBED_MODEL_NAME, embed_device, get_embedder
+from .onnx_embeddings import OnnxMiniLMEmbeddings
+
+# Let the MKL/BLAS kernels behind the encoder use every core
+torch.set_num_threads(os.cpu_count())
 
 
 CHUNK_SIZE = 1200
 CHUNK_OVERLAP = 150
+EMBED_DIM = 384  # all-MiniLM-L6-v2
+
+# Below this many vectors an exhaustive flat index is both exact and fast,
+# and IVF/PQ training wouldn't have enough data to converge anyway
+IVF_MIN_VECTORS = 2048
+PQ_SUBQUANTIZERS = 32
+DEFAULT_NPROBE = 16
+
+ENCODE_BATCH_SIZE = 64
+
+_st_model: SentenceTransformer | None = None
+
+
+def _get_st_model() -> SentenceTransformer:
+    # The shared HuggingFaceEmbeddings wrapper already holds the loaded
+    # SentenceTransformer (device and fp16 handled in _models); reuse it
+    # rather than loading the weights a second time in this process
+    client = getattr(get_embedder(), "client", None)
+    if isinstance(client, SentenceTransformer):
+        return client
+    global _st_model
+    if _st_model is None:
+        device = embed_device()
+        _st_model = SentenceTransformer(EMBED_MODEL_NAME, device=device)
+        if device == "cuda":
+            try:
+                _st_model.half()
+            except Exception:
+                pass
+    return _st_model
+
+
+# MiniLM was trained with 256-token inputs; longer chunks are truncated
+ENCODE_MAX_TOKENS = 256
+
+
+def encode_texts(texts: List[str]) -> np.ndarray:
+    """Batch-encode in length-sorted batches to minimize padding waste,
+    un-permuting the result back to input order.
+
+    Tokenization goes through the fast Rust tokenizer in one call per
+    batch and the tensors are fed straight to the underlying transformer
+    (mean-pool + L2-normalize), skipping SentenceTransformer's per-call
+    Python feature preparation. Vectors are written directly into one
+    preallocated output array."""
+    model = _get_st_model()
+    device = embed_device()
+    batch_size = 128 if device == "cuda" else ENCODE_BATCH_SIZE
+    order = np.argsort([len(t) for t in texts])
+
+    tokenizer = model.tokenizer
+    if not getattr(tokenizer, "is_fast", False):
+        # Slow tokenizer: let SentenceTransformer run its own pipeline
+        encoded = model.encode(
+            [texts[i] for i in order],
+            batch_size=batch_size,
+            convert_to_numpy=True,
+            show_progress_bar=False,
+            normalize_embeddings=True,
+        )
+        xb = np.empty_like(encoded, dtype=np.float32)
+        xb[order] = encoded
+        return xb
+
+    auto_model = model[0].auto_model
+    xb = np.empty((len(texts), EMBED_DIM), dtype=np.float32)
+    with torch.inference_mode():
+        for start in range(0, len(order), batch_size):
+            idx = order[start:start + batch_size]
+            enc = tokenizer(
+                [texts[i] for i in idx],
+                padding="longest",
+                truncation=True,
+                max_length=ENCODE_MAX_TOKENS,
+                return_tensors="pt",
+            )
+            enc = {k: v.to(device) for k, v in enc.items()}
+            out = auto_model(**enc)
+            mask = enc["attention_mask"].unsqueeze(-1).to(out.last_hidden_state.dtype)
+            summed = (out.last_hidden_state * mask).sum(dim=1)
+            pooled = summed / mask.sum(dim=1).clamp(min=1e-9)
+            pooled = torch.nn.functional.normalize(pooled, dim=1)
+            xb[idx] = pooled.float().cpu().numpy()
+    return xb
 
 
 def load_items(json_path: str) -> List[Dict]:
-    data = json.loads(Path(json_path).read_text(encoding="utf-8"))
+    # orjson parses the bytes directly — no separate Python-level UTF-8
+    # decode pass before parsing
+    data = orjson.loads(Path(json_path).read_bytes())
     return data.get("items", [])
 
 
+# Splitting is pure-Python string work; below this many items the process
+# pool's spawn/IPC cost outweighs the parallelism
+PARALLEL_SPLIT_MIN_ITEMS = 8
+
+_worker_splitter = None
+
+
+def _get_splitter():
+    # One splitter per process (main or pool worker). The Rust
+    # semantic-text-splitter runs entirely in native code with a plain
+    # character capacity (CHUNK_SIZE already is a char count); LangChain's
+    # pure-Python splitter stays as the fallback.
+    global _worker_splitter
+    if _worker_splitter is None:
+        if TextSplitter is not None:
+            _worker_splitter = TextSplitter(CHUNK_SIZE, CHUNK_OVERLAP)
+        else:
+            _worker_splitter = RecursiveCharacterTextSplitter(
+                chunk_size=CHUNK_SIZE,
+                chunk_overlap=CHUNK_OVERLAP,
+                separators=["\n\n", "\n", " ", ""]  # Better separators for technical content
+            )
+    return _worker_splitter
+
+
+def _split_item(content: str) -> List[str]:
+    splitter = _get_splitter()
+    if TextSplitter is not None and isinstance(splitter, TextSplitter):
+        return list(splitter.chunks(content))
+    return splitter.split_text(content)
+
+
 def build_documents(items: List[Dict]):
-    from langchain_core.documents import Document
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=CHUNK_SIZE, 
-        chunk_overlap=CHUNK_OVERLAP,
-        separators=["\n\n", "\n", " ", ""]  # Better separators for technical content
-    )
-
-    docs: List[Document] = []
-    for it in items:
-        content = it.get("content", "")
-        metadata = {k: it.get(k) for k in ["title", "content_type", "source_url"]}
-        
-        chunks = splitter.split_text(content)
-        
-        for i, chunk in enumerate(chunks):
-            # Add chunk info to metadata
-            chunk_metadata = metadata.copy()
-            chunk_metadata["chunk_index"] = i
-            chunk_metadata["total_chunks"] = len(chunks)
-            docs.append(Document(page_content=chunk, metadata=chunk_metadata))
-    
-    return docs
+    """Split items into parallel arrays (structure-of-arrays): chunk texts,
+    the owning item index per chunk, and one shared metadata dict per item.
+    Document objects are only materialized later for the docstore, so the
+    embed/add loop works on plain strings and a compact int array."""
+    contents = [it.get("content", "") for it in items]
+    metadatas: List[Dict] = [
+        {k: it.get(k) for k in ["title", "content_type", "source_url"]} for it in items
+    ]
+
+    if len(contents) >= PARALLEL_SPLIT_MIN_ITEMS:
+        with ProcessPoolExecutor(max_workers=os.cpu_count()) as ex:
+            split_lists = list(ex.map(_split_item, contents, chunksize=8))
+    else:
+        split_lists = [_split_item(c) for c in contents]
+
+    texts: List[str] = []
+    item_idx: List[int] = []
+    for j, chunks in enumerate(split_lists):
+        for chunk in chunks:
+            texts.append(chunk)
+            item_idx.append(j)
+
+    return texts, np.asarray(item_idx, dtype=np.int32), metadatas
+
+
+def _build_index(xb: np.ndarray) -> faiss.Index:
+    """Pick an index for the corpus size: exact flat search for small corpora,
+    IVF+PQ (non-exhaustive, quantized) once there is enough data to train on."""
+    # FAISS's C++ add expects one contiguous float32 matrix; everything is
+    # added in a single bulk call, never per-vector from Python
+    xb = np.ascontiguousarray(xb, dtype=np.float32)
+    n, d = xb.shape
+    # Inner product on normalized vectors == cosine similarity, and the IP
+    # kernel skips the per-distance subtraction L2 needs
+    faiss.normalize_L2(xb)
+    if n < IVF_MIN_VECTORS:
+        index = faiss.IndexFlatIP(d)
+        index.add(xb)
+        return index
+    nlist = int(4 * math.sqrt(n))
+    quantizer = faiss.IndexFlatIP(d)
+    index = faiss.IndexIVFPQ(quantizer, d, nlist, PQ_SUBQUANTIZERS, 8, faiss.METRIC_INNER_PRODUCT)
+    index.train(xb)
+    index.add(xb)
+    index.nprobe = DEFAULT_NPROBE
+    return index
+
+
+def _input_digest(json_path: str) -> str:
+    return hashlib.blake2b(Path(json_path).read_bytes()).hexdigest()
 
 
 def build_faiss_index(json_path: str, index_dir: str) -> str:
+    # If the input file is byte-identical to what the existing index was
+    # built from, the rebuild would be a no-op — skip it entirely
+    digest = _input_digest(json_path)
+    hash_file = Path(index_dir) / ".input_hash"
+    try:
+        if (
+            hash_file.exists()
+            and hash_file.read_text() == digest
+            and (Path(index_dir) / "index.faiss").exists()
+        ):
+            return index_dir
+    except Exception:
+        pass
+
     items = load_items(json_path)
-    
+
     if not items:
         raise ValueError("No items found in the scraped data. Please check if the website has content or try different include/exclude patterns.")
-    
-    docs = build_documents(items)
-    
-    if not docs:
+
+    texts, item_idx, metadatas = build_documents(items)
+
+    if not texts:
         raise ValueError("No text chunks could be created from the scraped content. The content might be too short or empty.")
-    
-    # Use free HuggingFace embeddings instead of OpenAI
-    embeddings = HuggingFaceEmbeddings(
-        model_name="sentence-transformers/all-MiniLM-L6-v2",
-        model_kwargs={'device': 'cpu'}
-    )
-    
+
+    # One shared embedder per process, also used by qa_agent at query time
+    embeddings = get_embedder()
+
     try:
-        vs = FAISS.from_documents(docs, embeddings)
+        # Embedding dominates build time, so unchanged chunks come from the
+        # on-disk cache and only new text hits the encoder
+        if isinstance(embeddings, OnnxMiniLMEmbeddings):
+            encode_fn = lambda ts: np.asarray(embeddings.embed_documents(ts), dtype=np.float32)
+            model_id = EMBED_MODEL_NAME + "#int8-onnx"
+        else:
+            encode_fn = encode_texts
+            model_id = EMBED_MODEL_NAME
+        xb = emb_cache.get_or_compute(texts, encode_fn, model_id)
+        index = _build_index(xb)
+
+        # Documents are materialized only now, for the docstore. Chunks of
+        # the same item share one metadata dict (title/url/content_type are
+        # identical across them and read-only downstream), so metadata
+        # allocations scale with items, not chunks.
+        from langchain_core.documents import Document
+        docstore_docs = {
+            str(i): Document(page_content=text, metadata=metadatas[int(j)])
+            for i, (text, j) in enumerate(zip(texts, item_idx))
+        }
+        docstore = InMemoryDocstore(docstore_docs)
+        index_to_docstore_id = {i: str(i) for i in range(len(texts))}
+        vs = FAISS(
+            embedding_function=embeddings,
+            index=index,
+            docstore=docstore,
+            index_to_docstore_id=index_to_docstore_id,
+            # All encoder paths emit L2-normalized vectors already;
+            # normalize_L2=True alongside MAX_INNER_PRODUCT would only
+            # trigger LangChain's metric-mismatch warning
+            distance_strategy=DistanceStrategy.MAX_INNER_PRODUCT,
+        )
         vs.save_local(index_dir)
+        try:
+            hash_file.write_text(digest)
+        except Exception:
+            pass
         return index_dir
     except Exception as e:
         raise ValueError(f"Failed to create FAISS index: {str(e)}. This might be due to empty content or embedding issues.")
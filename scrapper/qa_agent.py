@@ -1,52 +1,194 @@
 from __future__ import annotations
+import os
+import pickle
+from functools import lru_cache
+from pathlib import Path
 from typing import List
+
+import faiss
+import numpy as np
 from langchain_community.vectorstores import FAISS
-from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain_anthropic import ChatAnthropic
 from langchain.chains import RetrievalQA
+from langchain_core.prompts import ChatPromptTemplate
+
+from ._models import get_embedder
+
+# FAISS defaults to however OpenMP was configured (often 1 thread) and only
+# uses BLAS kernels above a batch-size threshold; set both up front
+faiss.omp_set_num_threads(os.cpu_count())
+try:
+    faiss.cvar.distance_compute_blas_threshold = 20
+except AttributeError:
+    pass
+
+QUERY_NPROBE = int(os.environ.get("KB_NPROBE", "16"))
+
+# Retrieve wide, rerank with a cross-encoder, keep only the best few — the
+# Claude prompt then carries 4 relevant chunks instead of 6 arbitrary ones
+RETRIEVE_K = 20
+RERANK_TOP_N = 4
+RERANKER_MODEL = "BAAI/bge-reranker-base"
+
+# Static instructions go first and are marked ephemeral so Anthropic caches
+# the prefix server-side; retrieved context varies per question and comes after
+_SYSTEM_PROMPT = (
+    "You are a helpful assistant answering questions about scraped website "
+    "content. Use only the provided context to answer. If the context does "
+    "not contain the answer, say so plainly instead of guessing. Cite the "
+    "source URLs from the context when relevant."
+)
+
+_QA_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", [{"type": "text", "text": _SYSTEM_PROMPT, "cache_control": {"type": "ephemeral"}}]),
+    ("human", "Context:\n{context}\n\nQuestion: {question}"),
+])
 
 
 def debug_index_contents(index_dir: str):
     """Debug function to check what's in the FAISS index"""
-    embeddings = HuggingFaceEmbeddings(
-        model_name="sentence-transformers/all-MiniLM-L6-v2",
-        model_kwargs={'device': 'cpu'}
-    )
-    vs = FAISS.load_local(index_dir, embeddings, allow_dangerous_deserialization=True)
-    
-    # Get all documents from the index
-    all_docs = vs.similarity_search("", k=100)  # Search with empty query to get all docs
+    vs = _load_vectorstore(index_dir)
+
+    # Walk the docstore directly — no embedding forward pass or ANN search
+    # is needed just to enumerate documents
+    if hasattr(vs.docstore, "_dict"):
+        all_docs = list(vs.docstore._dict.values())
+    else:
+        all_docs = vs.similarity_search("", k=100)
     print(f"Index contains {len(all_docs)} documents:")
     for i, doc in enumerate(all_docs):
         print(f"  {i+1}. {doc.metadata.get('title', 'No title')} - {doc.metadata.get('source_url', 'No URL')}")
         print(f"     Content: {doc.page_content[:100]}...")
-    
+
     return len(all_docs)
 
 
+# One reranker per process: _get_retriever memoizes per index_dir, and
+# without this each index would pin its own copy of the model
+@lru_cache(maxsize=1)
+def _get_reranker_model():
+    from langchain_community.cross_encoders import HuggingFaceCrossEncoder
+
+    return HuggingFaceCrossEncoder(model_name=RERANKER_MODEL)
+
+
+def _load_vectorstore(index_dir: str) -> FAISS:
+    embeddings = get_embedder()
+    try:
+        # Memory-map the index instead of copying it into RAM: the OS pages
+        # in only the lists a query touches, and multiple processes share
+        # one copy of the file cache
+        index = faiss.read_index(
+            str(Path(index_dir) / "index.faiss"),
+            faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY,
+        )
+        with open(Path(index_dir) / "index.pkl", "rb") as f:
+            docstore, index_to_docstore_id = pickle.load(f)
+        from langchain_community.vectorstores.utils import DistanceStrategy
+        return FAISS(
+            embedding_function=embeddings,
+            index=index,
+            docstore=docstore,
+            index_to_docstore_id=index_to_docstore_id,
+            distance_strategy=DistanceStrategy.MAX_INNER_PRODUCT,
+        )
+    except Exception:
+        return FAISS.load_local(index_dir, embeddings, allow_dangerous_deserialization=True)
+
+
 def load_retriever(index_dir: str):
-    embeddings = HuggingFaceEmbeddings(
-        model_name="sentence-transformers/all-MiniLM-L6-v2",
-        model_kwargs={'device': 'cpu'}
-    )
-    vs = FAISS.load_local(index_dir, embeddings, allow_dangerous_deserialization=True)
-    return vs.as_retriever(search_kwargs={"k": 6})
+    vs = _load_vectorstore(index_dir)
+    # IVF indexes come back with nprobe=1, which collapses recall
+    if hasattr(vs.index, "nprobe"):
+        vs.index.nprobe = QUERY_NPROBE
+    try:
+        from langchain.retrievers import ContextualCompressionRetriever
+        from langchain.retrievers.document_compressors import CrossEncoderReranker
 
+        base = vs.as_retriever(search_kwargs={"k": RETRIEVE_K})
+        reranker = CrossEncoderReranker(
+            model=_get_reranker_model(),
+            top_n=RERANK_TOP_N,
+        )
+        return ContextualCompressionRetriever(base_compressor=reranker, base_retriever=base)
+    except Exception:
+        # Reranker unavailable: fall back to plain top-k retrieval
+        return vs.as_retriever(search_kwargs={"k": 6})
 
-def answer_question(index_dir: str, question: str, anthropic_api_key: str, model: str = "claude-3-5-sonnet-20241022") -> str:
-    retriever = load_retriever(index_dir)
-    
-    llm = ChatAnthropic(
-        model=model, 
-        api_key=anthropic_api_key, 
+
+# Loading the index + embedder takes seconds; keep a handful warm per process
+@lru_cache(maxsize=8)
+def _get_retriever(index_dir: str):
+    return load_retriever(index_dir)
+
+
+# Near-duplicate questions skip retrieval and the LLM entirely: prior question
+# embeddings are kept per index and matched by cosine similarity
+_SEMANTIC_THRESHOLD = 0.97
+_semantic_cache: dict = {}  # index_dir -> (list[np.ndarray], list[str])
+
+
+def _embed_question(retriever, question: str) -> np.ndarray | None:
+    try:
+        base = getattr(retriever, "base_retriever", retriever)
+        embeddings = base.vectorstore.embeddings
+        vec = np.asarray(embeddings.embed_query(question), dtype=np.float32)
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm > 0 else vec
+    except Exception:
+        return None
+
+
+def _semantic_lookup(index_dir: str, q_vec: np.ndarray) -> str | None:
+    entry = _semantic_cache.get(index_dir)
+    if not entry:
+        return None
+    vecs, answers = entry
+    sims = np.stack(vecs) @ q_vec
+    best = int(np.argmax(sims))
+    if sims[best] > _SEMANTIC_THRESHOLD:
+        return answers[best]
+    return None
+
+
+def _semantic_store(index_dir: str, q_vec: np.ndarray, answer: str) -> None:
+    vecs, answers = _semantic_cache.setdefault(index_dir, ([], []))
+    vecs.append(q_vec)
+    answers.append(answer)
+
+
+# One client per (model, key): reuses the underlying HTTP connection pool
+# instead of re-establishing TLS on every question
+@lru_cache(maxsize=4)
+def _get_llm(model: str, anthropic_api_key: str) -> ChatAnthropic:
+    return ChatAnthropic(
+        model=model,
+        api_key=anthropic_api_key,
         temperature=0,
         max_tokens=2000
     )
+
+
+@lru_cache(maxsize=1024)
+def answer_question(index_dir: str, question: str, anthropic_api_key: str, model: str = "claude-3-5-sonnet-20241022") -> str:
+    retriever = _get_retriever(index_dir)
+
+    q_vec = _embed_question(retriever, question)
+    if q_vec is not None:
+        cached = _semantic_lookup(index_dir, q_vec)
+        if cached is not None:
+            return cached
+
+    llm = _get_llm(model, anthropic_api_key)
     qa = RetrievalQA.from_chain_type(
         llm=llm,
         retriever=retriever,
         chain_type="stuff",
         return_source_documents=True,
+        chain_type_kwargs={"prompt": _QA_PROMPT},
     )
     result = qa.invoke({"query": question})
-    return result["result"]
+    answer = result["result"]
+    if q_vec is not None:
+        _semantic_store(index_dir, q_vec, answer)
+    return answer
@@ -3,24 +3,31 @@
 Simple test script to verify the scraper works with various websites.
 """
 
+import logging
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from scrapper.crawler import crawl_site
 from scrapper.extractor import extract_markdown_items
 
+# Sites run concurrently, so per-site progress goes through logging (which
+# serializes records internally) instead of raw prints that would interleave
+logging.basicConfig(level=logging.INFO, format="%(message)s")
+log = logging.getLogger("test_sites")
+
 def test_site(url: str, max_pages: int = 10) -> dict:
     """Test scraping a single site."""
-    print(f"Testing: {url}")
-    
+    log.info(f"Testing: {url}")
+
     try:
         # Discover URLs
         urls = crawl_site(url, max_pages=max_pages, concurrency=4, include_patterns=[], exclude_patterns=[])
-        print(f"  Found {len(urls)} URLs")
-        
+        log.info(f"  [{url}] Found {len(urls)} URLs")
+
         # Extract content
         items = extract_markdown_items(urls)
-        print(f"  Extracted {len(items)} items")
-        
+        log.info(f"  [{url}] Extracted {len(items)} items")
+
         # Calculate success rate
         success_rate = len(items) / len(urls) if urls else 0
         
@@ -33,7 +40,7 @@ def test_site(url: str, max_pages: int = 10) -> dict:
         }
         
     except Exception as e:
-        print(f"  Error: {e}")
+        log.info(f"  [{url}] Error: {e}")
         return {
             "url": url,
             "urls_found": 0,
@@ -52,13 +59,13 @@ def main():
     ]
     
     print("🧪 Testing Knowledge Builder Scraper\n")
-    
-    results = []
-    for site in test_sites:
-        result = test_site(site, max_pages=5)
-        results.append(result)
-        print()
-    
+
+    # The work is I/O-bound (HTTP); running sites concurrently cuts wall time
+    # from the sum of per-site latencies to the max. map() preserves ordering.
+    with ThreadPoolExecutor(max_workers=len(test_sites)) as ex:
+        results = list(ex.map(lambda u: test_site(u, max_pages=5), test_sites))
+    print()
+
     # Summary
     print("📊 Test Results Summary")
     print("=" * 50)